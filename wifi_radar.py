@@ -13,14 +13,15 @@ Usage:
 
 import argparse
 import asyncio
+import gzip
 import http.server
 import json
 import math
 import random
+import struct
 import threading
 import time
 import webbrowser
-from collections import defaultdict, deque
 
 import numpy as np
 
@@ -31,6 +32,20 @@ try:
 except ImportError:
     HAS_COREWLAN = False
 
+# Numba is optional; without it the layout runs on plain NumPy
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+# orjson is optional; it serializes straight to bytes and is faster than json
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 # ---------------------------------------------------------------------------
 # Configuration
 # ---------------------------------------------------------------------------
@@ -40,7 +55,12 @@ SCAN_INTERVAL = 4          # seconds between scans
 HISTORY_LENGTH = 30        # number of scans to keep per BSSID
 MIN_SAMPLES = 5            # minimum co-observed scans for correlation
 CORRELATION_EDGE_THRESHOLD = 0.5
-LAYOUT_ITERATIONS = 50
+LAYOUT_ITERATIONS = 50        # max layout iterations after the AP set changes
+LAYOUT_STABLE_ITERATIONS = 5  # max layout iterations when the AP set is unchanged
+LAYOUT_TOLERANCE = 0.05       # stop early once no force component exceeds this
+CLIENT_QUEUE_FRAMES = 4       # frames buffered per client before the oldest is dropped
+BARNES_HUT_MIN_NODES = 1000  # use the octree layout from this many APs (needs numba)
+BARNES_HUT_THETA = 0.3       # opening angle: cell size / distance below this is merged
 
 # ---------------------------------------------------------------------------
 # WiFi Scanning
@@ -134,55 +154,171 @@ def scan_wifi_demo():
 # RSSI History & Pearson Correlation
 # ---------------------------------------------------------------------------
 
-rssi_history = defaultdict(lambda: deque(maxlen=HISTORY_LENGTH))
 scan_counter = 0
 latest_ssid = {}  # bssid -> last seen ssid/channel/band
 
+# Running sufficient statistics for pairwise Pearson over the history window.
+# Row/column i belongs to bssid_order[i]; entry [i, j] only counts scans in
+# which both i and j were observed.  RSSI readings are integers, so the sums
+# are kept as exact int32 and adding/removing scans never drifts.  All
+# buffers are allocated with spare capacity and grown by doubling.
+bssid_index = {}         # bssid -> row in the matrices below
+bssid_order = []         # row -> bssid
+# RSSI ring buffer, one row per BSSID; the column for a scan is
+# scan_counter % HISTORY_LENGTH.  RSSI in dBm fits int8 exactly, with
+# NO_RSSI marking scans where the AP was not seen.
+NO_RSSI = -128
+rssi_history = np.zeros((0, HISTORY_LENGTH), dtype=np.int8)
+first_seen = np.zeros(0, dtype=np.int64)
+pair_n = np.zeros((0, 0), dtype=np.int32)    # co-observed scans
+pair_sx = np.zeros((0, 0), dtype=np.int32)   # sum of x_i
+pair_sxx = np.zeros((0, 0), dtype=np.int32)  # sum of x_i^2
+pair_sxy = np.zeros((0, 0), dtype=np.int32)  # sum of x_i * x_j
+_corr_buf = np.zeros((0, 0), dtype=np.float32)
+
+
+def _grow_buffers(capacity):
+    global rssi_history, first_seen, pair_n, pair_sx, pair_sxx, pair_sxy, _corr_buf
+    n = len(bssid_order)
+    grown = np.full((capacity, HISTORY_LENGTH), NO_RSSI, dtype=np.int8)
+    grown[:n] = rssi_history[:n]
+    rssi_history = grown
+    grown = np.zeros(capacity, dtype=first_seen.dtype)
+    grown[:n] = first_seen[:n]
+    first_seen = grown
+    mats = []
+    for a in (pair_n, pair_sx, pair_sxx, pair_sxy):
+        grown = np.zeros((capacity, capacity), dtype=a.dtype)
+        grown[:n, :n] = a[:n, :n]
+        mats.append(grown)
+    pair_n, pair_sx, pair_sxx, pair_sxy = mats
+    _corr_buf = np.empty((capacity, capacity), dtype=np.float32)
+
+
+def _add_bssid(b):
+    i = len(bssid_order)
+    if i == first_seen.shape[0]:
+        _grow_buffers(max(64, 2 * i))
+    bssid_index[b] = i
+    bssid_order.append(b)
+    first_seen[i] = scan_counter
+
+
+def _observed(v, n):
+    """(mask, value) int32 vectors of length n for one scan column."""
+    m = np.zeros(n, dtype=np.int32)
+    x = np.zeros(n, dtype=np.int32)
+    seen = v != NO_RSSI
+    m[:len(v)] = seen
+    x[:len(v)][seen] = v[seen]
+    return m, x
+
+
+if HAS_NUMBA:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _update_pair_sums_jit(mo, xo, mn, xn, cnt, sx, sxx, sxy):
+        """Remove the old scan column and add the new one in a single pass."""
+        n = mn.shape[0]
+        for i in prange(n):
+            for j in range(n):
+                cnt[i, j] += mn[i] * mn[j] - mo[i] * mo[j]
+                sx[i, j] += xn[i] * mn[j] - xo[i] * mo[j]
+                sxx[i, j] += xn[i] * xn[i] * mn[j] - xo[i] * xo[i] * mo[j]
+                sxy[i, j] += xn[i] * xn[j] - xo[i] * xo[j]
+
+
+def _update_pair_sums(old, new):
+    """Replace one scan column in the pair sums: remove old, add new."""
+    n = len(new)
+    mo, xo = _observed(old, n)
+    mn, xn = _observed(new, n)
+    if HAS_NUMBA:
+        _update_pair_sums_jit(mo, xo, mn, xn, pair_n, pair_sx, pair_sxx, pair_sxy)
+        return
+    for m, x, sign in ((mo, xo, -1), (mn, xn, 1)):
+        if not m.any():
+            continue
+        pair_n[:n, :n] += sign * np.outer(m, m)
+        pair_sx[:n, :n] += sign * np.outer(x, m)
+        pair_sxx[:n, :n] += sign * np.outer(x * x, m)
+        pair_sxy[:n, :n] += sign * np.outer(x, x)
+
 
 def record_scan(results):
     global scan_counter
     scan_counter += 1
-    seen = set()
+    col = scan_counter % HISTORY_LENGTH
+    # The scan that falls out of the window is removed from the pair sums
+    # in the same update that adds the new one.
+    evicted = rssi_history[:len(bssid_order), col].copy()
+    rssi_history[:, col] = NO_RSSI
+    rows = []
     for ap in results:
         b = ap['bssid']
-        rssi_history[b].append((scan_counter, ap['rssi']))
+        if b not in bssid_index:
+            _add_bssid(b)
+        rows.append(bssid_index[b])
         latest_ssid[b] = ap
-        seen.add(b)
-    for b in list(rssi_history.keys()):
-        if b not in seen:
-            rssi_history[b].append((scan_counter, None))
+    # One scatter into the column instead of a numpy setitem per AP
+    rssi = np.fromiter((ap['rssi'] for ap in results), dtype=np.int64, count=len(rows))
+    rssi_history[rows, col] = np.clip(rssi, -127, 127)
+    _update_pair_sums(evicted, rssi_history[:len(bssid_order), col])
+
+
+if HAS_NUMBA:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _pearson_from_sums_jit(cnt, sx, sxx, sxy, min_samples, out):
+        """Pearson for every pair from the cached sums in a single pass.
+
+        Thread i owns row i's upper triangle and mirrors it into column i.
+        """
+        n = out.shape[0]
+        for i in prange(n):
+            out[i, i] = 1.0
+            for j in range(i + 1, n):
+                r = 0.0
+                c = np.int64(cnt[i, j])
+                if c >= min_samples:
+                    vx = c * sxx[i, j] - np.int64(sx[i, j]) * sx[i, j]
+                    vy = c * sxx[j, i] - np.int64(sx[j, i]) * sx[j, i]
+                    if vx > 0 and vy > 0:
+                        cov = c * sxy[i, j] - np.int64(sx[i, j]) * sx[j, i]
+                        r = min(max(cov / np.sqrt(float(vx) * float(vy)), -1.0), 1.0)
+                out[i, j] = r
+                out[j, i] = r
 
 
 def compute_correlations():
-    bssids = [b for b, h in rssi_history.items() if len(h) >= MIN_SAMPLES]
-    n = len(bssids)
+    """Return (bssids, corr) for every BSSID tracked for MIN_SAMPLES scans.
+
+    corr is a float32 view into a reused buffer and is only valid until the
+    next call.
+    """
+    # Rows are in first-seen order, so the eligible BSSIDs form a prefix.
+    samples = np.minimum(scan_counter - first_seen[:len(bssid_order)] + 1,
+                         HISTORY_LENGTH)
+    n = int(np.count_nonzero(samples >= MIN_SAMPLES))
+    bssids = bssid_order[:n]
     if n < 2:
-        return bssids, np.eye(max(n, 1))
-
-    all_scans = set()
-    for b in bssids:
-        for idx, _ in rssi_history[b]:
-            all_scans.add(idx)
-    scan_list = sorted(all_scans)
-    scan_to_col = {s: i for i, s in enumerate(scan_list)}
-
-    matrix = np.full((n, len(scan_list)), np.nan)
-    for i, b in enumerate(bssids):
-        for idx, rssi in rssi_history[b]:
-            if rssi is not None:
-                matrix[i, scan_to_col[idx]] = rssi
-
-    corr = np.zeros((n, n))
+        return bssids, np.eye(max(n, 1), dtype=np.float32)
+
+    corr = _corr_buf[:n, :n]
+    if HAS_NUMBA:
+        _pearson_from_sums_jit(pair_n, pair_sx, pair_sxx, pair_sxy, MIN_SAMPLES, corr)
+        return bssids, corr
+
+    # Pearson from the cached sums: (N*Sxy - Sx*Sy) / sqrt(varx * vary).
+    # Numerator and variances are exact in int32; the rest is float32.
+    cnt, sx, sxx, sxy = (a[:n, :n] for a in (pair_n, pair_sx, pair_sxx, pair_sxy))
+    cov = cnt * sxy - sx * sx.T
+    var = (cnt * sxx - sx * sx).astype(np.float32)
+    np.multiply(var, var.T, out=corr)
+    valid = (cnt >= MIN_SAMPLES) & (corr > 0)
+    np.sqrt(corr, out=corr)
+    np.divide(cov, corr, out=corr, where=valid)
+    corr[~valid] = 0.0
+    np.clip(corr, -1.0, 1.0, out=corr)
     np.fill_diagonal(corr, 1.0)
-    for i in range(n):
-        for j in range(i + 1, n):
-            mask = ~np.isnan(matrix[i]) & ~np.isnan(matrix[j])
-            if mask.sum() >= MIN_SAMPLES:
-                xi, xj = matrix[i, mask], matrix[j, mask]
-                if np.std(xi) > 0 and np.std(xj) > 0:
-                    r = np.corrcoef(xi, xj)[0, 1]
-                    if not np.isnan(r):
-                        corr[i, j] = corr[j, i] = r
     return bssids, corr
 
 
@@ -193,6 +329,255 @@ def compute_correlations():
 prev_positions = {}
 
 
+def _pair_springs(pair_corr):
+    """Rest length and stiffness of the spring between each pair.
+
+    Correlated pairs are pulled towards a short rest length, everything
+    else towards a longer one with a weaker spring.
+    """
+    linked = pair_corr > CORRELATION_EDGE_THRESHOLD
+    target = np.where(linked, 2.0 + (1.0 - pair_corr) * 4.0,
+                      6.0 + (1.0 - np.maximum(pair_corr, 0)) * 6.0)
+    stiffness = np.where(linked, 0.05, 0.02)
+    return target.astype(np.float32), stiffness.astype(np.float32)
+
+
+def _layout_forces(pos, ii, jj, target, stiffness, forces, work):
+    """Net force on every node for one layout iteration (NumPy version).
+
+    Each unordered pair (ii[k], jj[k]) is evaluated once and its force is
+    applied to both ends with opposite signs.  The result is written to
+    forces; work holds per-pair scratch arrays reused across iterations.
+    """
+    n = pos.shape[0]
+    diff, other, dist, scalar, repel = work
+    np.take(pos, jj, axis=0, out=diff)
+    diff -= np.take(pos, ii, axis=0, out=other)
+    np.einsum('ij,ij->i', diff, diff, out=dist)
+    np.sqrt(dist, out=dist)
+    np.maximum(dist, 0.1, out=dist)
+    # Repulsion (stronger when close) plus the spring towards the target
+    np.subtract(dist, target, out=scalar)
+    scalar *= stiffness
+    np.multiply(dist, dist, out=repel)
+    repel += 0.1
+    np.divide(-3.0, repel, out=repel)
+    scalar += repel
+    scalar /= dist
+    diff *= scalar[:, None]
+    for k in range(3):
+        forces[:, k] = np.bincount(ii, diff[:, k], minlength=n)
+        forces[:, k] -= np.bincount(jj, diff[:, k], minlength=n)
+    forces -= pos * 0.005  # weak centering, once per node
+
+
+if HAS_NUMBA:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _layout_forces_jit(pos, corr, thresh, forces):
+        """Same as _layout_forces, fused into one pass with no n x n temporaries.
+
+        Each thread owns one node and only writes its own row of forces.
+        """
+        n = pos.shape[0]
+        for i in prange(n):
+            fx = fy = fz = 0.0
+            for j in range(n):
+                if i == j:
+                    continue
+                dx = pos[j, 0] - pos[i, 0]
+                dy = pos[j, 1] - pos[i, 1]
+                dz = pos[j, 2] - pos[i, 2]
+                dist = max(np.sqrt(dx * dx + dy * dy + dz * dz), 0.1)
+                c = corr[i, j]
+                if c > thresh:
+                    f = (dist - (2.0 + (1.0 - c) * 4.0)) * 0.05
+                else:
+                    f = (dist - (6.0 + (1.0 - max(c, 0.0)) * 6.0)) * 0.02
+                f = (f - 3.0 / (dist * dist + 0.1)) / dist
+                fx += f * dx
+                fy += f * dy
+                fz += f * dz
+            forces[i, 0] = fx - pos[i, 0] * 0.005
+            forces[i, 1] = fy - pos[i, 1] * 0.005
+            forces[i, 2] = fz - pos[i, 2] * 0.005
+
+    # Barnes-Hut: every pair feels the force of an uncorrelated pair
+    # (rest length 12, stiffness 0.02).  Per unit direction that is
+    #     0.02 * d  +  (-3 / (d^2 + 0.1) - 0.24)
+    # where the linear part sums exactly to 0.02 * (sum(pos) - n * pos_i) and
+    # the rest depends only on distance, so far-away groups of nodes can be
+    # replaced by their centre of mass.  A weakly correlated pair
+    # (0 < c <= threshold) adds 0.12 * c to the constant term; node i's share
+    # of that is folded in as 0.12 * weak[i], the mean over its weak pairs.
+    # Pairs above the threshold get an exact correction.
+
+    @njit(cache=True)
+    def _spread_bits(v):
+        """Spread the low 21 bits of v so there are two zero bits between each."""
+        v &= 0x1fffff
+        v = (v | (v << 32)) & 0x1f00000000ffff
+        v = (v | (v << 16)) & 0x1f0000ff0000ff
+        v = (v | (v << 8)) & 0x100f00f00f00f00f
+        v = (v | (v << 4)) & 0x10c30c30c30c30c3
+        v = (v | (v << 2)) & 0x1249249249249249
+        return v
+
+    @njit(cache=True)
+    def _build_octree(pos):
+        """Octree over pos, built top-down from Morton-sorted points.
+
+        Cells are stored in depth-first order.  Cell c holds the points
+        order[lo[c]:hi[c]], has edge length size[c] and centre of mass
+        com[c]; skip[c] is the first cell after c's subtree.
+        """
+        n = pos.shape[0]
+        low = pos[0].copy()
+        high = pos[0].copy()
+        for i in range(1, n):
+            for k in range(3):
+                low[k] = min(low[k], pos[i, k])
+                high[k] = max(high[k], pos[i, k])
+        extent = max(max(high[0] - low[0], high[1] - low[1]),
+                     max(high[2] - low[2], 1e-6))
+        scale = 2097151.0 / extent
+
+        codes = np.empty(n, dtype=np.int64)
+        for i in range(n):
+            code = 0
+            for k in range(3):
+                q = min(int((pos[i, k] - low[k]) * scale), 2097151)
+                code |= _spread_bits(q) << k
+            codes[i] = code
+        order = np.argsort(codes)
+        codes = codes[order]
+
+        cap = 2 * n + 1
+        lo = np.empty(cap, dtype=np.int64)
+        hi = np.empty(cap, dtype=np.int64)
+        leaf = np.empty(cap, dtype=np.bool_)
+        parent = np.empty(cap, dtype=np.int64)
+        size = np.empty(cap)
+        com = np.zeros((cap, 3))
+
+        stack = np.empty((8 * 22, 4), dtype=np.int64)   # lo, hi, level, parent
+        stack[0, 0], stack[0, 1], stack[0, 2], stack[0, 3] = 0, n, 0, -1
+        top = 1
+        bounds = np.empty(9, dtype=np.int64)
+        ncells = 0
+        while top > 0:
+            top -= 1
+            a, b, level, p = stack[top, 0], stack[top, 1], stack[top, 2], stack[top, 3]
+            # Skip levels where every point falls into the same child
+            while level < 21 and ((codes[a] >> (3 * (20 - level))) & 7) == \
+                    ((codes[b - 1] >> (3 * (20 - level))) & 7):
+                level += 1
+            c = ncells
+            ncells += 1
+            lo[c], hi[c], parent[c] = a, b, p
+            size[c] = extent / (1 << level)
+            for k in range(a, b):
+                for d in range(3):
+                    com[c, d] += pos[order[k], d]
+            for d in range(3):
+                com[c, d] /= b - a
+            leaf[c] = b - a <= 4 or level >= 21
+            if leaf[c]:
+                continue
+            # Split the range into children by the next 3 Morton bits
+            shift = 3 * (20 - level)
+            nb = 0
+            bounds[0] = a
+            for k in range(a + 1, b):
+                if (codes[k] >> shift) & 7 != (codes[k - 1] >> shift) & 7:
+                    nb += 1
+                    bounds[nb] = k
+            nb += 1
+            bounds[nb] = b
+            for k in range(nb - 1, -1, -1):   # reversed, so children pop in order
+                stack[top, 0], stack[top, 1] = bounds[k], bounds[k + 1]
+                stack[top, 2], stack[top, 3] = level + 1, c
+                top += 1
+
+        skip = np.ones(ncells, dtype=np.int64)
+        for c in range(ncells - 1, 0, -1):
+            skip[parent[c]] += skip[c]
+        for c in range(ncells):
+            skip[c] += c
+        return order, lo[:ncells], hi[:ncells], leaf[:ncells], size[:ncells], \
+            com[:ncells], skip
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _barnes_hut_forces(pos, indptr, indices, target, stiffness, weak, theta,
+                           forces):
+        """Layout forces with Barnes-Hut far-field approximation.
+
+        Node i's correlated pairs are indices[indptr[i]:indptr[i + 1]] (CSR,
+        both directions stored), with matching target/stiffness entries; the
+        octree handles the rest, with weak[i] standing in for the correlation
+        of each of them.
+        The result is written to forces.
+        """
+        n = pos.shape[0]
+        order, lo, hi, leaf, size, com, skip = _build_octree(pos)
+        ncells = lo.shape[0]
+        rank = np.empty(n, dtype=np.int64)
+        for k in range(n):
+            rank[order[k]] = k
+        total = np.zeros(3)
+        for i in range(n):
+            for d in range(3):
+                total[d] += pos[i, d]
+
+        for i in prange(n):
+            px, py, pz = pos[i, 0], pos[i, 1], pos[i, 2]
+            fx = fy = fz = 0.0
+            u = 0.12 * weak[i] - 0.24
+            c = 0
+            while c < ncells:
+                if leaf[c]:
+                    for k in range(lo[c], hi[c]):
+                        j = order[k]
+                        if j == i:
+                            continue
+                        dx = pos[j, 0] - px
+                        dy = pos[j, 1] - py
+                        dz = pos[j, 2] - pz
+                        dist = max(np.sqrt(dx * dx + dy * dy + dz * dz), 0.1)
+                        f = (-3.0 / (dist * dist + 0.1) + u) / dist
+                        fx += f * dx
+                        fy += f * dy
+                        fz += f * dz
+                    c = skip[c]
+                    continue
+                dx = com[c, 0] - px
+                dy = com[c, 1] - py
+                dz = com[c, 2] - pz
+                dist = max(np.sqrt(dx * dx + dy * dy + dz * dz), 0.1)
+                if (rank[i] < lo[c] or rank[i] >= hi[c]) and size[c] < theta * dist:
+                    f = (hi[c] - lo[c]) * (-3.0 / (dist * dist + 0.1) + u) / dist
+                    fx += f * dx
+                    fy += f * dy
+                    fz += f * dz
+                    c = skip[c]
+                else:
+                    c += 1
+            # Exact correction for this node's correlated pairs
+            for k in range(indptr[i], indptr[i + 1]):
+                j = indices[k]
+                dx = pos[j, 0] - px
+                dy = pos[j, 1] - py
+                dz = pos[j, 2] - pz
+                dist = max(np.sqrt(dx * dx + dy * dy + dz * dz), 0.1)
+                f = ((dist - target[k]) * stiffness[k]
+                     - (dist - 12.0) * 0.02 - 0.12 * weak[i]) / dist
+                fx += f * dx
+                fy += f * dy
+                fz += f * dz
+            forces[i, 0] = fx + 0.02 * (total[0] - n * px) - px * 0.005
+            forces[i, 1] = fy + 0.02 * (total[1] - n * py) - py * 0.005
+            forces[i, 2] = fz + 0.02 * (total[2] - n * pz) - pz * 0.005
+
+
 def compute_layout(bssids, corr):
     global prev_positions
     n = len(bssids)
@@ -200,39 +585,55 @@ def compute_layout(bssids, corr):
         prev_positions = {}
         return {}
 
+    # Warm-start from the previous layout; a full run is only needed when
+    # APs appeared or disappeared.
+    if prev_positions.keys() == set(bssids):
+        iterations = LAYOUT_STABLE_ITERATIONS
+    else:
+        iterations = LAYOUT_ITERATIONS
+    # Everything stays float32: the browser renders in single precision.
     pos = np.array([
         prev_positions.get(b, np.random.randn(3) * 10.0) for b in bssids
-    ], dtype=float)
-
-    for _ in range(LAYOUT_ITERATIONS):
-        forces = np.zeros((n, 3))
-        for i in range(n):
-            for j in range(i + 1, n):
-                diff = pos[j] - pos[i]
-                dist = max(np.linalg.norm(diff), 0.1)
-                direction = diff / dist
-
-                # Repulsion: always push apart (stronger when close)
-                repulsion = -3.0 / (dist * dist + 0.1)
-                forces[i] += direction * repulsion
-                forces[j] -= direction * repulsion
-
-                # Attraction: only for correlated pairs
-                if corr[i, j] > CORRELATION_EDGE_THRESHOLD:
-                    target = 2.0 + (1.0 - corr[i, j]) * 4.0
-                    attraction = (dist - target) * 0.05
-                    forces[i] += direction * attraction
-                    forces[j] -= direction * attraction
-                else:
-                    # Non-correlated: push to target distance
-                    target = 6.0 + (1.0 - max(corr[i, j], 0)) * 6.0
-                    f = (dist - target) * 0.02
-                    forces[i] += direction * f
-                    forces[j] -= direction * f
-
-            forces[i] -= pos[i] * 0.005  # weak centering
-
-        pos += np.clip(forces, -2.0, 2.0) * 0.3
+    ], dtype=np.float32)
+
+    use_octree = HAS_NUMBA and n >= BARNES_HUT_MIN_NODES
+    if use_octree:
+        # Only pairs above the edge threshold get their own spring.  Noisy
+        # RSSI makes about half of all pairs weakly positive, so those are
+        # folded into the octree as one mean correlation per node.
+        linked = corr > CORRELATION_EDGE_THRESHOLD
+        np.fill_diagonal(linked, False)
+        rows, cols = np.nonzero(linked)
+        degree = np.bincount(rows, minlength=n)
+        indptr = np.concatenate(([0], np.cumsum(degree)))
+        target, stiffness = _pair_springs(corr[rows, cols])
+        weak = np.where(linked, 0.0, np.maximum(corr, 0.0))
+        np.fill_diagonal(weak, 0.0)
+        weak = (weak.sum(axis=1) / np.maximum(n - 1 - degree, 1)).astype(np.float32)
+    elif HAS_NUMBA:
+        corr = np.ascontiguousarray(corr, dtype=np.float32)
+    else:
+        ii, jj = np.triu_indices(n, 1)
+        target, stiffness = _pair_springs(corr[ii, jj])
+        m = len(ii)
+        work = (np.empty((m, 3), np.float32), np.empty((m, 3), np.float32),
+                np.empty(m, np.float32), np.empty(m, np.float32),
+                np.empty(m, np.float32))
+    forces = np.empty((n, 3), np.float32)
+    for _ in range(iterations):
+        if use_octree:
+            _barnes_hut_forces(pos, indptr, cols, target, stiffness, weak,
+                               BARNES_HUT_THETA, forces)
+        elif HAS_NUMBA:
+            _layout_forces_jit(pos, corr, CORRELATION_EDGE_THRESHOLD, forces)
+        else:
+            _layout_forces(pos, ii, jj, target, stiffness, forces, work)
+        converged = np.abs(forces).max() < LAYOUT_TOLERANCE
+        np.clip(forces, -2.0, 2.0, out=forces)
+        forces *= 0.3
+        pos += forces
+        if converged:
+            break
 
     prev_positions = {bssids[i]: pos[i].copy() for i in range(n)}
     return {bssids[i]: pos[i].tolist() for i in range(n)}
@@ -242,7 +643,7 @@ def compute_layout(bssids, corr):
 # Server
 # ---------------------------------------------------------------------------
 
-connected_clients = set()
+connected_clients = {}  # websocket -> queue of frames waiting to be sent
 event_loop = None
 
 
@@ -345,6 +746,7 @@ import { OrbitControls } from 'three/addons/controls/OrbitControls.js';
 import { EffectComposer } from 'three/addons/postprocessing/EffectComposer.js';
 import { RenderPass } from 'three/addons/postprocessing/RenderPass.js';
 import { UnrealBloomPass } from 'three/addons/postprocessing/UnrealBloomPass.js';
+import { GPUComputationRenderer } from 'three/addons/misc/GPUComputationRenderer.js';
 
 // ---- Scene ----
 const scene = new THREE.Scene();
@@ -427,22 +829,10 @@ let latestData = { nodes: [], edges: [] };
 const nodeGroup = new THREE.Group();
 scene.add(nodeGroup);
 const nodeMeshes = {};   // id -> { mesh, label, ring, data, phaseOffset }
+let meshArray = [];      // node meshes for raycasting, rebuilt by updateScene
 const edgeGroup = new THREE.Group();
 scene.add(edgeGroup);
 
-// Band colors
-function bandColor(band, rssi) {
-  const strength = THREE.MathUtils.clamp((rssi + 90) / 55, 0, 1);
-  if (band === '5GHz') {
-    return new THREE.Color(0.0, 0.6 + strength * 0.4, 0.8 + strength * 0.2);  // cyan
-  }
-  return new THREE.Color(0.0, 0.7 + strength * 0.3, 0.2 + strength * 0.3);  // green
-}
-
-function rssiToRadius(rssi) {
-  return THREE.MathUtils.clamp(THREE.MathUtils.mapLinear(rssi, -90, -30, 0.3, 1.0), 0.25, 1.2);
-}
-
 function makeLabel(text, rssi) {
   const canvas = document.createElement('canvas');
   canvas.width = 512; canvas.height = 96;
@@ -483,10 +873,11 @@ function updateScene(data) {
   for (const node of nodes) {
     seen.add(node.id);
     let entry = nodeMeshes[node.id];
-    const radius = rssiToRadius(node.rssi);
-    const color = bandColor(node.band, node.rssi);
 
     if (!entry) {
+      // Color and radius come precomputed from the server
+      const radius = node.radius;
+      const color = new THREE.Color(...node.color);
       const geo = new THREE.SphereGeometry(radius, 24, 24);
       const mat = new THREE.MeshStandardMaterial({
         color, emissive: color, emissiveIntensity: 1.8,
@@ -523,13 +914,12 @@ function updateScene(data) {
     entry.data = node;
 
     // Smooth position update
-    const target = new THREE.Vector3(...node.pos);
+    const target = new THREE.Vector3().fromArray(node.pos);
     entry.mesh.position.lerp(target, 0.06);
 
     // Update color
-    const col = bandColor(node.band, node.rssi);
-    entry.mesh.material.color.copy(col);
-    entry.mesh.material.emissive.copy(col);
+    entry.mesh.material.color.setRGB(...node.color);
+    entry.mesh.material.emissive.setRGB(...node.color);
 
     // Label visibility
     entry.label.visible = showLabels;
@@ -577,6 +967,8 @@ function updateScene(data) {
 
   // Update side panel
   updateNetList(nodes);
+
+  meshArray = Object.values(nodeMeshes).map(n => n.mesh);
 }
 
 // ---- Network list panel ----
@@ -624,8 +1016,7 @@ renderer.domElement.addEventListener('click', (e) => {
   mouse.x = (e.clientX / innerWidth) * 2 - 1;
   mouse.y = -(e.clientY / innerHeight) * 2 + 1;
   raycaster.setFromCamera(mouse, camera);
-  const meshes = Object.values(nodeMeshes).map(n => n.mesh);
-  const hits = raycaster.intersectObjects(meshes);
+  const hits = raycaster.intersectObjects(meshArray);
   if (hits.length > 0) {
     const id = hits[0].object.userData.nodeId;
     if (id) {
@@ -643,11 +1034,9 @@ renderer.domElement.addEventListener('mousemove', (e) => {
   mouse.x = (e.clientX / innerWidth) * 2 - 1;
   mouse.y = -(e.clientY / innerHeight) * 2 + 1;
   raycaster.setFromCamera(mouse, camera);
-  const meshes = Object.values(nodeMeshes).map(n => n.mesh);
-  const hits = raycaster.intersectObjects(meshes);
+  const hits = raycaster.intersectObjects(meshArray);
   if (hits.length > 0) {
-    const hit = hits[0].object;
-    const entry = Object.values(nodeMeshes).find(n => n.mesh === hit);
+    const entry = nodeMeshes[hits[0].object.userData.nodeId];
     if (entry) {
       const d = entry.data;
       renderer.domElement.style.cursor = 'pointer';
@@ -702,13 +1091,130 @@ window.resetCamera = () => {
   updateScene(latestData);
 };
 
+// ---- GPU layout (--gpu-layout) ----
+// The same force-directed step as the server, one fragment per node,
+// ping-ponged between two float textures of positions.
+const LAYOUT_ITERATIONS = """ + str(LAYOUT_ITERATIONS) + r""";
+const LAYOUT_STABLE_ITERATIONS = """ + str(LAYOUT_STABLE_ITERATIONS) + r""";
+const layoutShader = `
+uniform sampler2D corrTex;
+uniform int nodeCount;
+uniform float threshold;
+void main() {
+  int i = int(gl_FragCoord.x);
+  vec3 p = texelFetch(texturePosition, ivec2(i, 0), 0).xyz;
+  vec3 force = vec3(0.0);
+  for (int j = 0; j < nodeCount; j++) {
+    if (j == i) continue;
+    vec3 diff = texelFetch(texturePosition, ivec2(j, 0), 0).xyz - p;
+    float dist = max(length(diff), 0.1);
+    float c = texelFetch(corrTex, ivec2(j, i), 0).r;
+    float f = c > threshold
+      ? (dist - (2.0 + (1.0 - c) * 4.0)) * 0.05
+      : (dist - (6.0 + (1.0 - max(c, 0.0)) * 6.0)) * 0.02;
+    force += diff * ((f - 3.0 / (dist * dist + 0.1)) / dist);
+  }
+  force -= p * 0.005;
+  gl_FragColor = vec4(p + clamp(force, -2.0, 2.0) * 0.3, 1.0);
+}`;
+const gpuLayout = { ids: '', gpu: null, variable: null, corrTex: null, readBuf: null, error: null };
+const gpuPositions = {};  // id -> [x, y, z] from the last GPU layout
+
+// Sets node.pos for every node; returns false if the GPU layout is unavailable.
+function runGpuLayout(nodes, corr) {
+  if (gpuLayout.error !== null) return false;
+  const n = nodes.length;
+  if (n === 0) return true;
+  const ids = nodes.map(node => node.id).join('\n');
+  const changed = ids !== gpuLayout.ids;
+  if (changed) {
+    // Node set changed: rebuild the textures, seeding known nodes in place
+    if (gpuLayout.gpu) {
+      gpuLayout.gpu.dispose();
+      gpuLayout.corrTex.dispose();
+    }
+    const present = new Set(nodes.map(node => node.id));
+    for (const id of Object.keys(gpuPositions)) {
+      if (!present.has(id)) delete gpuPositions[id];
+    }
+    const gpu = new GPUComputationRenderer(n, 1, renderer);
+    const init = gpu.createTexture();
+    nodes.forEach((node, i) => {
+      const p = gpuPositions[node.id] || [0, 0, 0].map(() => (Math.random() - 0.5) * 20);
+      init.image.data.set([p[0], p[1], p[2], 1], i * 4);
+    });
+    const variable = gpu.addVariable('texturePosition', layoutShader, init);
+    gpu.setVariableDependencies(variable, [variable]);
+    const corrTex = new THREE.DataTexture(
+      new Float32Array(n * n), n, n, THREE.RedFormat, THREE.FloatType);
+    variable.material.uniforms.corrTex = { value: corrTex };
+    variable.material.uniforms.nodeCount = { value: n };
+    variable.material.uniforms.threshold = { value: """ + str(CORRELATION_EDGE_THRESHOLD) + r""" };
+    const error = gpu.init();
+    if (error !== null) {
+      // e.g. no float render targets: stop rather than read back garbage
+      gpu.dispose();
+      corrTex.dispose();
+      Object.assign(gpuLayout, { ids: '', gpu: null, variable: null, corrTex: null, error });
+      console.error('[gpu layout]', error);
+      document.getElementById('stats').textContent = `GPU LAYOUT UNAVAILABLE  //  ${error}`;
+      return false;
+    }
+    Object.assign(gpuLayout, { ids, gpu, variable, corrTex, readBuf: new Float32Array(n * 4) });
+  }
+  gpuLayout.corrTex.image.data.set(corr);
+  gpuLayout.corrTex.needsUpdate = true;
+  const steps = changed ? LAYOUT_ITERATIONS : LAYOUT_STABLE_ITERATIONS;
+  for (let s = 0; s < steps; s++) gpuLayout.gpu.compute();
+  const target = gpuLayout.gpu.getCurrentRenderTarget(gpuLayout.variable);
+  renderer.readRenderTargetPixels(target, 0, 0, n, 1, gpuLayout.readBuf);
+  nodes.forEach((node, i) => {
+    node.pos = Array.from(gpuLayout.readBuf.subarray(i * 4, i * 4 + 3));
+    gpuPositions[node.id] = node.pos;
+  });
+  return true;
+}
+
 // ---- WebSocket ----
 let scanCount = 0;
+const textDecoder = new TextDecoder();
+
+// Frame: uint32 header length, JSON header, padding to 4 bytes, a float32
+// block, then uint16 (from, to, correlation * 10000) per edge.  The float32
+// block is xyz per node, or the n x n correlation matrix when the server
+// leaves the layout to the browser (header.layout === 'client').
+// Returns null if the frame cannot be laid out.
+function decodeFrame(buf) {
+  const headerLen = new DataView(buf).getUint32(0, true);
+  const data = JSON.parse(textDecoder.decode(new Uint8Array(buf, 4, headerLen)));
+  const nodes = data.nodes;
+  const clientLayout = data.layout === 'client';
+  let offset = (4 + headerLen + 3) & ~3;
+  const block = new Float32Array(buf, offset, nodes.length * (clientLayout ? nodes.length : 3));
+  offset += block.byteLength;
+  const raw = new Uint16Array(buf, offset, (buf.byteLength - offset) / 2);
+  if (clientLayout) {
+    if (!runGpuLayout(nodes, block)) return null;
+  } else {
+    nodes.forEach((node, i) => { node.pos = block.subarray(i * 3, i * 3 + 3); });
+  }
+  data.edges = [];
+  for (let k = 0; k < raw.length; k += 3) {
+    data.edges.push({
+      from: nodes[raw[k]].id, to: nodes[raw[k + 1]].id,
+      correlation: raw[k + 2] / 10000,
+    });
+  }
+  return data;
+}
+
 function connectWS() {
   const ws = new WebSocket(`ws://${location.hostname}:""" + str(WS_PORT) + r"""`);
+  ws.binaryType = 'arraybuffer';
   ws.onmessage = (e) => {
     scanCount++;
-    updateScene(JSON.parse(e.data));
+    const data = decodeFrame(e.data);
+    if (data) updateScene(data);
   };
   ws.onclose = () => setTimeout(connectWS, 2000);
   ws.onerror = () => {};
@@ -750,81 +1256,156 @@ animate();
 </html>"""
 
 
+# The page never changes at runtime, so encode and compress it once
+HTML_BYTES = HTML_PAGE.encode('utf-8')
+HTML_GZIP = gzip.compress(HTML_BYTES, compresslevel=9)
+
+
 class HTTPHandler(http.server.BaseHTTPRequestHandler):
     def do_GET(self):
+        use_gzip = 'gzip' in self.headers.get('Accept-Encoding', '')
+        body = HTML_GZIP if use_gzip else HTML_BYTES
         self.send_response(200)
         self.send_header('Content-Type', 'text/html; charset=utf-8')
         self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Vary', 'Accept-Encoding')
+        if use_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
         self.end_headers()
-        self.wfile.write(HTML_PAGE.encode())
+        self.wfile.write(body)
 
     def log_message(self, *args):
         pass
 
 
 async def ws_handler(websocket):
-    connected_clients.add(websocket)
+    queue = asyncio.Queue(maxsize=CLIENT_QUEUE_FRAMES)
+    connected_clients[websocket] = queue
+    sender = asyncio.create_task(client_sender(websocket, queue))
     try:
         async for _ in websocket:
             pass
     finally:
-        connected_clients.discard(websocket)
+        connected_clients.pop(websocket, None)
+        sender.cancel()
+
+
+async def client_sender(websocket, queue):
+    """Deliver queued frames to one client, so a slow client only delays itself."""
+    while True:
+        frame = await queue.get()
+        try:
+            await websocket.send(frame)
+        except Exception:
+            return  # connection is gone; ws_handler cleans up
+
+
+def encode_payload(payload):
+    """Serialize a payload to compact UTF-8 JSON bytes."""
+    if HAS_ORJSON:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+
+def encode_frame(header, block, edges):
+    """Pack one scan into a binary WebSocket frame.
+
+    Layout (little-endian): uint32 header length, JSON header, zero padding
+    to a 4-byte boundary, the float32 block, then uint16
+    (from, to, correlation * 10000) per edge, with from/to as indices into
+    header['nodes'].  The block is x/y/z per node, or the n x n correlation
+    matrix when header['layout'] == 'client'.
+    """
+    head = encode_payload(header)
+    pad = b'\0' * (-(4 + len(head)) % 4)
+    return b''.join((
+        struct.pack('<I', len(head)), head, pad,
+        block.astype('<f4').tobytes(), edges.astype('<u2').tobytes(),
+    ))
 
 
-async def broadcast(payload):
-    if connected_clients:
-        msg = json.dumps(payload)
-        await asyncio.gather(
-            *[c.send(msg) for c in connected_clients],
-            return_exceptions=True,
-        )
+async def broadcast(frame):
+    for queue in connected_clients.values():
+        if queue.full():
+            queue.get_nowait()  # client is falling behind: drop its oldest frame
+        queue.put_nowait(frame)
 
 
-def scanner_loop(scan_fn, loop):
-    """Background thread: scan WiFi, compute correlations, broadcast."""
+def band_color(band, rssi):
+    """Node RGB color: cyan for 5GHz, green for 2.4GHz, brighter when stronger."""
+    strength = min(max((rssi + 90) / 55, 0.0), 1.0)
+    if band == '5GHz':
+        rgb = (0.0, 0.6 + strength * 0.4, 0.8 + strength * 0.2)
+    else:
+        rgb = (0.0, 0.7 + strength * 0.3, 0.2 + strength * 0.3)
+    return [round(c, 3) for c in rgb]
+
+
+def rssi_to_radius(rssi):
+    """Node sphere radius: 0.3 at -90 dBm up to 1.0 at -30 dBm, clamped."""
+    radius = 0.3 + (rssi + 90) * (1.0 - 0.3) / 60
+    return round(min(max(radius, 0.25), 1.2), 3)
+
+
+def scanner_loop(scan_fn, loop, client_layout=False):
+    """Background thread: scan WiFi, compute correlations, broadcast.
+
+    With client_layout the browser runs the layout itself, so frames carry
+    the correlation matrix instead of node positions.
+    """
     scan_num = 0
-    last_payload = {'nodes': [], 'edges': [], 'scan': 0}
+    last_scene = ([], np.zeros((0, 3), np.float32), np.zeros((0, 3), np.uint16))
     while True:
         try:
             scan_num += 1
             results = scan_fn()
             # If scan failed (None), re-broadcast last known data
             if results is None:
-                last_payload['scan'] = scan_num
-                asyncio.run_coroutine_threadsafe(broadcast(last_payload), loop)
+                nodes, block, edges = last_scene
+                header = {'nodes': nodes, 'scan': scan_num}
+                if client_layout:
+                    header['layout'] = 'client'
+                asyncio.run_coroutine_threadsafe(
+                    broadcast(encode_frame(header, block, edges)), loop)
                 time.sleep(SCAN_INTERVAL)
                 continue
             nodes = []
-            edges = []
+            block = np.zeros(0, np.float32)
+            edges = np.zeros((0, 3))
 
             if results:
                 record_scan(results)
                 bssids, corr = compute_correlations()
-                positions = compute_layout(bssids, corr)
-
-                for b in bssids:
-                    if b in positions and b in latest_ssid:
-                        ap = latest_ssid[b]
-                        nodes.append({
-                            'id': b,
-                            'ssid': ap['ssid'],
-                            'rssi': ap['rssi'],
-                            'channel': ap['channel'],
-                            'band': ap['band'],
-                            'pos': positions[b],
-                        })
-
-                for i, b1 in enumerate(bssids):
-                    for j, b2 in enumerate(bssids):
-                        if i < j and corr[i, j] > CORRELATION_EDGE_THRESHOLD:
-                            edges.append({
-                                'from': b1, 'to': b2,
-                                'correlation': round(float(corr[i, j]), 3),
-                            })
-
-            payload = {'nodes': nodes, 'edges': edges, 'scan': scan_num}
-            last_payload = payload
-            asyncio.run_coroutine_threadsafe(broadcast(payload), loop)
+                n = len(bssids)
+
+                nodes = [{
+                    'id': b,
+                    'ssid': latest_ssid[b]['ssid'],
+                    'rssi': latest_ssid[b]['rssi'],
+                    'channel': latest_ssid[b]['channel'],
+                    'band': latest_ssid[b]['band'],
+                    'color': band_color(latest_ssid[b]['band'], latest_ssid[b]['rssi']),
+                    'radius': rssi_to_radius(latest_ssid[b]['rssi']),
+                } for b in bssids]
+                if client_layout:
+                    block = corr[:n, :n]
+                else:
+                    layout = compute_layout(bssids, corr)
+                    block = np.asarray([layout[b] for b in bssids], dtype=np.float32)
+
+                ii, jj = np.triu_indices(n, 1)
+                vals = corr[ii, jj]
+                keep = vals > CORRELATION_EDGE_THRESHOLD
+                edges = np.column_stack((ii[keep], jj[keep], np.round(vals[keep] * 10000)))
+
+            edges = edges.astype(np.uint16)
+            last_scene = (nodes, np.array(block, dtype=np.float32), edges)
+            header = {'nodes': nodes, 'scan': scan_num}
+            if client_layout:
+                header['layout'] = 'client'
+            asyncio.run_coroutine_threadsafe(
+                broadcast(encode_frame(header, *last_scene[1:])), loop)
 
         except Exception as e:
             print(f"[scan error] {e}")
@@ -838,6 +1419,8 @@ def main():
                         help='Use real WiFi scanning (macOS only, requires CoreWLAN + Location Services)')
     parser.add_argument('--port', type=int, default=HTTP_PORT,
                         help=f'HTTP port (default {HTTP_PORT})')
+    parser.add_argument('--gpu-layout', action='store_true',
+                        help='Run the 3D layout on the GPU in the browser (WebGL2)')
     args = parser.parse_args()
 
     if args.live:
@@ -855,15 +1438,19 @@ def main():
         print("[mode] Demo — using synthetic WiFi data")
         print("[info] Use --live for real WiFi scanning (macOS only)")
 
+    if args.gpu_layout:
+        print("[mode] GPU layout — the browser runs the 3D layout with WebGL2")
+
     # Start HTTP server
-    httpd = http.server.HTTPServer(('127.0.0.1', args.port), HTTPHandler)
+    httpd = http.server.ThreadingHTTPServer(('127.0.0.1', args.port), HTTPHandler)
     threading.Thread(target=httpd.serve_forever, daemon=True).start()
 
     # Asyncio event loop for WebSocket
     loop = asyncio.new_event_loop()
 
     # Start scanner thread
-    threading.Thread(target=scanner_loop, args=(scan_fn, loop), daemon=True).start()
+    threading.Thread(target=scanner_loop, args=(scan_fn, loop, args.gpu_layout),
+                     daemon=True).start()
 
     url = f'http://127.0.0.1:{args.port}'
     print(f"[server] Running at {url}")